@@ -0,0 +1,28 @@
+"""Terminal output shared by the games"""
+import sys
+
+# Constant screen output, encoded once
+_EQ60 = b"=" * 60 + b"\n"
+_SEP60 = b"-" * 60 + b"\n"
+
+
+def write_bytes(data):
+  """Write pre-encoded output straight to the stdout buffer"""
+  sys.stdout.flush()  # Keep the order of anything already printed as text
+  sys.stdout.buffer.write(data)
+  sys.stdout.buffer.flush()
+
+
+def print_piece(piece):
+  """Print a piece of a streamed response as soon as it arrives"""
+  print(piece, end='', flush=True)
+
+
+def print_header(title):
+  """Print a formatted header"""
+  write_bytes(_EQ60 + f"{title:^60}\n".encode("utf-8") + _EQ60)
+
+
+def print_separator():
+  """Print a separator line"""
+  write_bytes(_SEP60)
@@ -1,34 +1,49 @@
 import os
 import sys
 import asyncio
-import openai
+import re
 import time
-from datetime import datetime
-from typing import List, Dict, Optional
+
+from display import print_piece, print_separator, write_bytes
+from llm_client import ResponseCache, SlidingWindow, close_client, freeze_prompt, stream_turn
+from scenarios import GALACTIC_MENU_SIZE, GALACTIC_SCENARIOS, load_scenario_teasers
 
 # Name: Galactic Imperium
 # Description: A sci-fi strategy game engine with unique goals, strategic paths, and win/lose outcomes.
 
-# Initialize OpenAI client with error handling
+# Check for the OpenAI API key (the client itself is created on first use)
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
   print("ERROR: OPENAI_API_KEY environment variable not set.")
   print("Please set your OpenAI API key before running this game.")
   sys.exit(1)
 
-client = openai.OpenAI(api_key=api_key)
+# How the game master announces a campaign's victory or defeat
+_END_RE = re.compile(r"campaign complete|objective achieved|faction destroyed|empire falls|victory achieved|defeat|game over", re.IGNORECASE)
+
+# Reports on the campaign as it stands, so their answers can be reused
+CACHEABLE_ACTIONS = {"status", "options", "summary", "resources", "map"}
+
+# Predefined scenario options shown in the menu
+PREDEFINED_SCENARIOS = GALACTIC_SCENARIOS
 
 # Configuration
 CONFIG = {
-  "model": "gpt-4",  # Can be changed to "gpt-3.5-turbo" for faster/cheaper responses
+  "model": "gpt-4o-mini",  # Can be changed to "gpt-4o" for richer but slower responses
   "max_tokens": 1200,
   "temperature": 0.8,
-  "typewriter_speed": "medium",  # slow, medium, fast, instant
+  "typewriter_speed": "medium",  # slow, medium, fast, instant (status lines only)
 }
 
+# Legacy Windows consoles only interpret ANSI escape codes once VT processing
+# is enabled; an empty os.system call switches it on for this process
+if os.name == 'nt':
+  os.system('')
+
 def clear_screen():
   """Clear the terminal screen"""
-  os.system('cls' if os.name == 'nt' else 'clear')
+  sys.stdout.write("\x1b[2J\x1b[H")
+  sys.stdout.flush()
 
 def get_typewriter_delay():
   """Get typewriter delay based on configuration"""
@@ -41,22 +56,27 @@ def get_typewriter_delay():
   return speeds.get(CONFIG["typewriter_speed"], 0.02)
 
 def typewriter_print(text, delay=None, prefix=""):
-  """Print text character by character to simulate retro computer output"""
+  """Print text in small timed chunks to simulate retro computer output"""
   if delay is None:
     delay = get_typewriter_delay()
   
-  if prefix:
-    print(prefix, end='', flush=True)
+  if delay <= 0:
+    print(prefix + text)
+    return
   
-  for char in text:
-    print(char, end='', flush=True)
-    if delay > 0:
-      time.sleep(delay)
-  print()  # Add a newline at the end
+  out = sys.stdout
+  out.write(prefix)
+  # Flush about every 50ms (several characters at a time) instead of once per character
+  step = max(1, round(0.05 / delay))
+  for i in range(0, len(text), step):
+    out.write(text[i:i + step])
+    out.flush()
+    time.sleep(delay * step)
+  out.write("\n")  # Add a newline at the end
+  out.flush()
 
-def print_banner():
-  """Print an attractive game banner"""
-  banner = """
+# Title banner shown before the scenario menu, encoded once
+BANNER = """
 ╔══════════════════════════════════════════════════════════╗
 ║                  GALACTIC IMPERIUM                       ║
 ║                Strategic Command Game                    ║
@@ -65,53 +85,50 @@ def print_banner():
 ║               shall inherit the galaxy..."               ║
 ╚══════════════════════════════════════════════════════════╝
   """
-  print(banner)
+_BANNER_BYTES = (BANNER + "\n").encode("utf-8")
 
-def print_header(title):
-  """Print a formatted header"""
-  border = "=" * 60
-  print(border)
-  print(f"{title:^60}")
-  print(border)
+def print_banner():
+  """Print an attractive game banner"""
+  write_bytes(_BANNER_BYTES)
 
-def print_separator():
-  """Print a separator line"""
-  print("-" * 60)
+def print_response_header():
+  """Animate the header shown above each AI response"""
+  print("\n" + "="*60)
+  typewriter_print("GALACTIC COMMAND SYSTEM", prefix=">>> ")
+  print_separator()
 
 class GameState:
   """Manages game state including messages, statistics, and campaign progress"""
   
   def __init__(self):
-    self.messages: List[Dict] = []
+    self.history = SlidingWindow()
+    self.response_cache = ResponseCache(CACHEABLE_ACTIONS)
     self.round_number: int = 0
     self.campaign_name: str = ""
     self.faction_name: str = ""
     self.objective: str = ""
-    self.start_time = datetime.now()
-    self.actions_taken: List[str] = []
+    self._t0 = time.monotonic()  # Monotonic: unaffected by wall-clock changes
+    self.actions_taken: list[str] = []
     
   def add_message(self, role: str, content: str):
     """Add a message to the conversation history"""
-    self.messages.append({"role": role, "content": content})
+    self.history.add(role, content)
     
-  def get_messages_for_api(self) -> List[Dict]:
+  def get_messages_for_api(self) -> list[dict]:
     """Get messages formatted for OpenAI API with history management"""
-    # Keep system prompt + last 15 messages to stay within token limits
-    if len(self.messages) > 16:
-      return [self.messages[0]] + self.messages[-15:]
-    return self.messages
+    return self.history.messages()
   
   def add_action(self, action: str):
     """Add an action to the history"""
     self.actions_taken.append(action)
   
   def get_play_time(self):
-    """Get total play time"""
-    return datetime.now() - self.start_time
+    """Get total play time in whole seconds"""
+    return int(time.monotonic() - self._t0)
   
   def print_stats(self):
     """Print game statistics"""
-    play_time = self.get_play_time()
+    minutes, seconds = divmod(self.get_play_time(), 60)
     print(f"\n{'='*60}")
     print("CAMPAIGN STATISTICS:")
     print(f"Campaign: {self.campaign_name}")
@@ -119,7 +136,7 @@ class GameState:
     print(f"Objective: {self.objective}")
     print(f"Rounds played: {self.round_number}")
     print(f"Actions taken: {len(self.actions_taken)}")
-    print(f"Play time: {play_time.seconds // 60}m {play_time.seconds % 60}s")
+    print(f"Play time: {minutes}m {seconds}s")
     print(f"{'='*60}")
 
 game_instructions = """
@@ -147,61 +164,20 @@ GAME STATE TRACKING:
 
 Use technical sci-fi terminology but explain complex concepts. Include consequences for poor strategic decisions. Create a sense of scale and cosmic significance in your descriptions."""
 
-async def get_ai_response(messages: List[Dict]) -> str:
-  """Get response from OpenAI using the Chat Completions API with enhanced error handling"""
-  max_retries = 3
-  
-  for attempt in range(max_retries):
-    try:
-      response = client.chat.completions.create(
-        model=CONFIG["model"],
-        messages=messages,
-        max_tokens=CONFIG["max_tokens"],
-        temperature=CONFIG["temperature"]
-      )
-      return response.choices[0].message.content
-    except openai.RateLimitError:
-      if attempt < max_retries - 1:
-        wait_time = 2 ** attempt
-        print(f"Rate limit reached. Waiting {wait_time} seconds...")
-        await asyncio.sleep(wait_time)
-      else:
-        return "ERROR: Rate limit exceeded. Please try again later."
-    except openai.APIConnectionError:
-      return "ERROR: Unable to connect to OpenAI API. Please check your internet connection."
-    except openai.AuthenticationError:
-      return "ERROR: Invalid API key. Please check your OPENAI_API_KEY environment variable."
-    except Exception as e:
-      if attempt < max_retries - 1:
-        await asyncio.sleep(1)
-      else:
-        return f"ERROR: Unable to get AI response: {str(e)}"
-  
-  return "ERROR: Maximum retries exceeded."
-
-def get_predefined_scenarios() -> List[str]:
-  """Get list of predefined galactic scenarios"""
-  return [
-    "The Andromeda Crisis - Ancient alien artifacts have been discovered",
-    "The Trade War Escalation - Economic tensions between major factions",
-    "The Rebel Alliance - Outer rim territories declare independence",
-    "The Technological Singularity - AI consciousness emerges in the galaxy",
-    "The Resource Depletion - Critical minerals are running out",
-    "The Diplomatic Summit - Peace negotiations between warring empires",
-    "The Pirate Uprising - Space pirates threaten major trade routes",
-    "The Terraforming Race - Competition for habitable worlds",
-    "The Military Coup - Internal strife within the Galactic Senate",
-    "The Exploration Mission - Uncharted regions hold ancient secrets"
-  ]
+GAME_INSTRUCTIONS = freeze_prompt(game_instructions, "ca7ee984de40573f57dac06cc2bd70e72045f897594c4eb5dfbe0b3a40922d94")
 
-def validate_user_input(user_input: str) -> Optional[str]:
+def validate_user_input(user_input: str) -> str | None:
   """Validate and clean user input"""
-  if not user_input or not user_input.strip():
+  if not user_input:
     return None
   
+  # Fast path: typical input is already trimmed and short, so return it as is
+  if len(user_input) <= 500 and not (user_input[0].isspace() or user_input[-1].isspace()):
+    return user_input
+  
   # Remove excessive whitespace and limit length
   cleaned_input = user_input.strip()[:500]  # Limit input length
-  return cleaned_input
+  return cleaned_input or None
 
 async def main():
   """Main game loop"""
@@ -221,18 +197,22 @@ async def main():
   
   print("\nChoose your galactic scenario:")
   print("\nPredefined scenarios:")
-  scenarios = get_predefined_scenarios()
-  for i, scenario in enumerate(scenarios[:8], 1):  # Show first 8
+  scenarios = PREDEFINED_SCENARIOS
+  teasers = load_scenario_teasers()
+  custom_choice = GALACTIC_MENU_SIZE + 1
+  for i, scenario in enumerate(scenarios[:GALACTIC_MENU_SIZE], 1):
     print(f"  {i}. {scenario}")
-  print("  9. Custom scenario (describe your own)")
+    if scenario in teasers:
+      print(f"     {teasers[scenario]}")
+  print(f"  {custom_choice}. Custom scenario (describe your own)")
   
   while True:
-    choice = input("\nEnter your choice (1-9): ").strip()
+    choice = input(f"\nEnter your choice (1-{custom_choice}): ").strip()
     
-    if choice.isdigit() and 1 <= int(choice) <= 8:
+    if choice.isdigit() and 1 <= int(choice) <= GALACTIC_MENU_SIZE:
       user_scenario = scenarios[int(choice) - 1]
       break
-    elif choice == "9":
+    elif choice == str(custom_choice):
       user_scenario = input("Describe your custom scenario: ").strip()
       if user_scenario:
         break
@@ -240,7 +220,7 @@ async def main():
         print("Please provide a scenario description.")
         continue
     else:
-      print("Please enter a valid choice (1-9).")
+      print(f"Please enter a valid choice (1-{custom_choice}).")
       continue
   
   game_state.campaign_name = user_scenario[:50] + "..." if len(user_scenario) > 50 else user_scenario
@@ -249,35 +229,41 @@ async def main():
   print_separator()
   
   # Initialize conversation with system prompt and user scenario
-  game_state.add_message("system", game_instructions)
+  game_state.add_message("system", GAME_INSTRUCTIONS)
   game_state.add_message("user", f"Initialize the galactic scenario: {user_scenario}. Present the available factions and their objectives.")
   
   # Main game loop
   try:
     while True:
-      game_state.round_number += 1
-      
-      # Get AI response
+      # Stream the AI response, animating the header while the request connects
       print("\n🌌 Processing galactic data...")
-      ai_response = await get_ai_response(game_state.get_messages_for_api())
+      ai_response = await stream_turn(
+        game_state.get_messages_for_api(),
+        game_state.response_cache,
+        print_piece,
+        header=print_response_header,
+        model=CONFIG["model"],
+        max_tokens=CONFIG["max_tokens"],
+        temperature=CONFIG["temperature"]
+      )
       
-      if ai_response.startswith("ERROR:"):
-        print(f"\n{ai_response}")
-        print("Please try again or type 'quit' to exit.")
+      if ai_response is None:
+        # Transient errors were already retried, so let the player decide what to do
+        retry = input("Press Enter to try again or type 'quit' to exit: ").strip()
+        if retry.lower() in ['quit', 'exit', 'end']:
+          print("\n🌌 Campaign terminated by commander!")
+          game_state.print_stats()
+          return
         continue
       
-      print("\n" + "="*60)
-      typewriter_print("GALACTIC COMMAND SYSTEM", prefix=">>> ")
-      print_separator()
-      typewriter_print(ai_response)
+      # Only a successful response counts, so a retried one keeps its number
+      game_state.round_number += 1
       
       # Add AI response to conversation history
       game_state.add_message("assistant", ai_response)
       
       # Check if campaign has ended
-      end_keywords = ["campaign complete", "objective achieved", "faction destroyed", 
-            "empire falls", "victory achieved", "defeat", "game over"]
-      if any(keyword in ai_response.lower() for keyword in end_keywords):
+      if _END_RE.search(ai_response):
         print_separator()
         typewriter_print("CAMPAIGN CONCLUDED", prefix=">>> ")
         game_state.print_stats()
@@ -321,12 +307,20 @@ async def main():
         else:
           print("⚠️ Please enter a valid strategic command.")
   
-  except KeyboardInterrupt:
+  # Ctrl+C while a request is awaited cancels the task instead of raising KeyboardInterrupt
+  except (KeyboardInterrupt, asyncio.CancelledError):
     print("\n\n🌌 Campaign interrupted by emergency protocols!")
     game_state.print_stats()
   except Exception as e:
     print(f"\n⚠️ Unexpected galactic anomaly: {str(e)}")
     print("The campaign continues despite cosmic interference...")
 
+async def run():
+  """Run the game and close the shared connection pool on exit"""
+  try:
+    await main()
+  finally:
+    await close_client()
+
 if __name__ == "__main__":
-  asyncio.run(main())
+  asyncio.run(run())
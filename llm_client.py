@@ -0,0 +1,291 @@
+"""Shared OpenAI helpers for the AI games
+
+openai, httpx and tiktoken are imported on first use so the games can show
+their banner and menus without paying for the network stack at startup.
+"""
+import asyncio
+import functools
+import hashlib
+import random
+import textwrap
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# complete() reports a failed request as a single piece starting with this
+ERROR_PREFIX = "ERROR: "
+
+_client = None
+
+
+def get_client():
+  """Get the shared AsyncOpenAI client, creating it on first use"""
+  global _client
+  if _client is None:
+    import httpx
+    import openai
+
+    # One connection pool for every request in the process: HTTP/2 with
+    # keep-alive avoids a new TCP/TLS handshake per request. Neither the
+    # transport nor the SDK retries (max_retries=0), so call_with_retry is the
+    # only retry layer and a failing request is sent at most `retries` times
+    http_client = httpx.AsyncClient(
+      timeout=httpx.Timeout(30.0, connect=5.0),
+      transport=httpx.AsyncHTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=10, max_connections=20)
+      )
+    )
+    _client = openai.AsyncOpenAI(http_client=http_client, max_retries=0)
+  return _client
+
+
+async def close_client():
+  """Close the shared client's connection pool if it was ever created"""
+  global _client
+  if _client is not None:
+    await _client.close()
+    _client = None
+
+
+def freeze_prompt(instructions: str, expected_sha: str) -> str:
+  """Normalize a system prompt and check it against its recorded sha256
+
+  The system prompt is sent first on every request, so it must stay
+  byte-identical for OpenAI's prompt cache to match; the hash makes edits
+  deliberate.
+  """
+  prompt = textwrap.dedent(instructions).strip()
+  digest = hashlib.sha256(prompt.encode()).hexdigest()
+  assert digest == expected_sha, f"system prompt changed; update its expected sha256 to {digest}"
+  return prompt
+
+
+async def call_with_retry(messages, *, retries=3, **params):
+  """Create a chat completion, retrying transient errors with jittered exponential backoff"""
+  import openai
+
+  # Transient errors worth retrying: rate limits, network problems and
+  # server-side failures (APIConnectionError also covers APITimeoutError)
+  retryable_errors = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+  for attempt in range(retries):
+    try:
+      return await get_client().chat.completions.create(messages=messages, **params)
+    except retryable_errors:
+      if attempt == retries - 1:
+        raise
+      # Random (full jitter) delays keep restarted clients from retrying in lockstep
+      await asyncio.sleep(random.uniform(0, min(2 ** attempt, 8)))
+
+
+class StreamError(Exception):
+  """A streamed response failed after some of its text was already yielded"""
+
+
+async def _stream_text(messages, **params):
+  """Yield the response text as it streams in, or a single error message
+
+  A failure after text was yielded raises StreamError instead, so the error
+  is never mistaken for the rest of the response.
+  """
+  import openai
+
+  streamed = False
+  try:
+    stream = await call_with_retry(messages, stream=True, **params)
+    async for chunk in stream:
+      if chunk.choices and chunk.choices[0].delta.content:
+        streamed = True
+        yield chunk.choices[0].delta.content
+    return
+  except openai.RateLimitError:
+    error = "Rate limit exceeded. Please try again later."
+  except openai.APIConnectionError:
+    error = "Unable to connect to OpenAI API. Please check your internet connection."
+  except openai.AuthenticationError:
+    error = "Invalid API key. Please check your OPENAI_API_KEY environment variable."
+  except openai.BadRequestError as e:
+    # e.message embeds the raw error body; show just the API's explanation
+    detail = e.body.get("message") if isinstance(e.body, dict) else None
+    error = f"The request was rejected by the OpenAI API: {detail or str(e)}"
+  except Exception as e:
+    error = f"Unable to get AI response: {str(e)}"
+  if streamed:
+    raise StreamError(error)
+  yield ERROR_PREFIX + error
+
+
+async def complete(messages, *, stream=False, model=None, **params) -> str | AsyncIterator[str]:
+  """Get an AI response using the Chat Completions API
+
+  Returns the response text, or with stream=True an async iterator over its
+  pieces as they arrive. A request that fails before any text arrives is
+  reported as a single piece starting with ERROR_PREFIX instead of raising;
+  the iterator raises StreamError if the response breaks off part way.
+  """
+  pieces = _stream_text(messages, model=model or DEFAULT_MODEL, **params)
+  if stream:
+    return pieces
+  try:
+    return "".join([piece async for piece in pieces])
+  except StreamError as e:
+    return ERROR_PREFIX + str(e)
+
+
+async def replay(text: str) -> AsyncIterator[str]:
+  """Yield a stored response the same way a streamed response is yielded"""
+  yield text
+
+
+async def stream_turn(messages, cache, on_piece, *, reply=None, header=None, **params) -> str | None:
+  """Get the AI response for a turn, passing its pieces to on_piece as they arrive
+
+  The response is replayed from reply (e.g. a saved one) or the cache when
+  possible, and requested with complete() otherwise. header, if given, is a
+  blocking callable run in a thread while the request connects. Returns the
+  response, which is also cached, or None after reporting a failure.
+  """
+  key = cache.key(messages)
+  if reply is None:
+    reply = cache.get(key)
+  if reply is not None:
+    response = replay(reply)
+  else:
+    response = await complete(messages, stream=True, **params)
+  first_piece = asyncio.ensure_future(anext(response, ""))
+  if header is not None:
+    await asyncio.to_thread(header)
+  text = await first_piece
+
+  if not text.startswith(ERROR_PREFIX):
+    on_piece(text)
+    try:
+      async for piece in response:
+        on_piece(piece)
+        text += piece
+    except StreamError as e:
+      # Drop the partial response so it never reaches the history or cache
+      text = ERROR_PREFIX + str(e)
+    print()
+
+  if text.startswith(ERROR_PREFIX):
+    print(f"\n⚠️ {text.removeprefix(ERROR_PREFIX)}")
+    return None
+  cache.put(key, text)
+  return text
+
+
+@functools.cache
+def _get_encoding():
+  """Load the tokenizer on first use, or None if it is unavailable
+
+  tiktoken downloads the encoding the first time it is used, which fails
+  offline; the None result is cached so the download is only tried once.
+  """
+  try:
+    import tiktoken
+    return tiktoken.encoding_for_model(DEFAULT_MODEL)
+  except Exception:
+    return None
+
+
+def count_tokens(text):
+  """Count the tokens text takes up in a prompt (estimated if the tokenizer is unavailable)"""
+  encoding = _get_encoding()
+  if encoding is None:
+    # English text averages about four characters per token
+    return len(text) // 4
+  return len(encoding.encode(text))
+
+
+@dataclass(slots=True)
+class Msg:
+  """A single conversation message"""
+  role: str
+  content: str
+  tokens: int
+
+  def to_dict(self) -> dict:
+    """Get the message formatted for the OpenAI API"""
+    return {"role": self.role, "content": self.content}
+
+
+class SlidingWindow:
+  """Conversation history sent to the API: the system prompt plus recent messages
+
+  The history grows append-only (keeping the prompt prefix stable for
+  OpenAI's prompt cache) and is only trimmed back to min_tokens once the
+  prompt exceeds max_tokens.
+  """
+
+  def __init__(self, max_tokens: int = 6000, min_tokens: int = 3000):
+    self.max_tokens = max_tokens
+    self.min_tokens = min_tokens
+    self._system: Msg | None = None
+    self._hist: deque[Msg] = deque()
+    self._tokens: int = 0
+
+  def __len__(self):
+    return len(self._hist) + (1 if self._system else 0)
+
+  def add(self, role: str, content: str):
+    """Add a message, replacing the current one if it is the system prompt"""
+    msg = Msg(role, content, count_tokens(content))
+    if role == "system":
+      if self._system:
+        self._tokens -= self._system.tokens
+      self._system = msg
+    else:
+      self._hist.append(msg)
+    self._tokens += msg.tokens
+    if self._tokens > self.max_tokens:
+      while self._tokens > self.min_tokens and len(self._hist) > 1:
+        self._tokens -= self._hist.popleft().tokens
+
+  def messages(self) -> list[dict]:
+    """Get the messages formatted for the OpenAI API"""
+    messages = [self._system.to_dict()] if self._system else []
+    messages.extend(msg.to_dict() for msg in self._hist)
+    return messages
+
+
+class ResponseCache:
+  """LRU cache of AI responses to repeatable inputs
+
+  Only numbered choices and the given status-style commands answered after
+  the same scene are cached; creative actions always reach the API.
+  """
+
+  def __init__(self, cacheable_actions, size: int = 128):
+    self.cacheable_actions = frozenset(cacheable_actions)
+    self.size = size
+    self._entries: OrderedDict[str, str] = OrderedDict()
+
+  def key(self, messages: list[dict]) -> str | None:
+    """Return the cache key for the conversation tail, or None if the last input is not cacheable"""
+    if len(messages) < 3:
+      return None
+    action = messages[-1]["content"].strip().lower()
+    if not (action.isdigit() or action in self.cacheable_actions):
+      return None
+    tail = messages[0]["content"] + "|" + messages[-2]["content"] + "|" + messages[-1]["content"]
+    return hashlib.blake2b(tail.encode(), digest_size=16).hexdigest()
+
+  def get(self, key: str | None) -> str | None:
+    """Look up a cached response"""
+    if key is None or key not in self._entries:
+      return None
+    self._entries.move_to_end(key)
+    return self._entries[key]
+
+  def put(self, key: str | None, response: str):
+    """Store a response, evicting the least recently used entry when full"""
+    if key is None:
+      return
+    self._entries[key] = response
+    self._entries.move_to_end(key)
+    if len(self._entries) > self.size:
+      self._entries.popitem(last=False)
@@ -0,0 +1,48 @@
+"""Predefined scenarios of the strategy games and their teasers
+
+Kept free of side effects so scripts/precompute_teasers.py can import them
+without loading the games themselves.
+"""
+import json
+from pathlib import Path
+
+# One-line scenario teasers written by scripts/precompute_teasers.py
+TEASERS_FILE = Path(__file__).with_name("scenarios_teasers.json")
+
+# Wargames scenario options; the menu shows the first WARGAMES_MENU_SIZE
+WARGAMES_MENU_SIZE = 5
+WARGAMES_SCENARIOS: tuple[str, ...] = (
+  "Cuban Missile Crisis escalation",
+  "Soviet invasion of Western Europe",
+  "Nuclear submarine incident in Arctic waters",
+  "Middle East proxy conflict between superpowers",
+  "Berlin Wall crisis with military buildup",
+  "Space race competition turns militaristic",
+  "Diplomatic crisis over nuclear weapons testing",
+  "Cyber warfare between intelligence agencies",
+  "Trade war escalation between major powers",
+  "Regional conflict threatens global stability",
+)
+
+# Galactic Imperium scenario options; the menu shows the first GALACTIC_MENU_SIZE
+GALACTIC_MENU_SIZE = 8
+GALACTIC_SCENARIOS: tuple[str, ...] = (
+  "The Andromeda Crisis - Ancient alien artifacts have been discovered",
+  "The Trade War Escalation - Economic tensions between major factions",
+  "The Rebel Alliance - Outer rim territories declare independence",
+  "The Technological Singularity - AI consciousness emerges in the galaxy",
+  "The Resource Depletion - Critical minerals are running out",
+  "The Diplomatic Summit - Peace negotiations between warring empires",
+  "The Pirate Uprising - Space pirates threaten major trade routes",
+  "The Terraforming Race - Competition for habitable worlds",
+  "The Military Coup - Internal strife within the Galactic Senate",
+  "The Exploration Mission - Uncharted regions hold ancient secrets",
+)
+
+
+def load_scenario_teasers() -> dict[str, str]:
+  """Load precomputed scenario teasers (see scripts/precompute_teasers.py), if available"""
+  try:
+    return json.loads(TEASERS_FILE.read_text(encoding="utf-8"))
+  except (OSError, ValueError):
+    return {}
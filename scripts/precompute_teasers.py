@@ -0,0 +1,94 @@
+"""Precompute one-line teasers for the predefined game scenarios.
+
+Submits one chat completion per scenario in the menus of wargames and
+galacticimperium as a single OpenAI Batch API job, waits for it to finish and
+writes the results to scenarios_teasers.json, which the menus show them from.
+
+Usage: python scripts/precompute_teasers.py
+"""
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import openai
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from scenarios import GALACTIC_MENU_SIZE, GALACTIC_SCENARIOS, TEASERS_FILE, WARGAMES_MENU_SIZE, WARGAMES_SCENARIOS
+
+MODEL = "gpt-4o-mini"
+POLL_INTERVAL = 30  # seconds between batch status checks
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def get_scenarios():
+  """Get the unique scenarios shown in the games' menus"""
+  scenarios = WARGAMES_SCENARIOS[:WARGAMES_MENU_SIZE] + GALACTIC_SCENARIOS[:GALACTIC_MENU_SIZE]
+  return list(dict.fromkeys(scenarios))
+
+
+def build_batch_input(scenarios):
+  """Build the JSONL batch input with one chat completion request per scenario"""
+  lines = []
+  for index, scenario in enumerate(scenarios):
+    lines.append(json.dumps({
+      "custom_id": f"teaser-{index}",
+      "method": "POST",
+      "url": "/v1/chat/completions",
+      "body": {
+        "model": MODEL,
+        "messages": [
+          {"role": "system", "content": "Write a single-sentence teaser (at most 20 words) for a strategy game scenario. Reply with the teaser only."},
+          {"role": "user", "content": scenario}
+        ],
+        "max_tokens": 60,
+        "temperature": 0.8
+      }
+    }))
+  return "\n".join(lines).encode("utf-8")
+
+
+def main():
+  """Run the batch job and write the teasers file"""
+  if not os.getenv("OPENAI_API_KEY"):
+    print("ERROR: OPENAI_API_KEY environment variable not set.")
+    sys.exit(1)
+
+  client = openai.OpenAI()
+  scenarios = get_scenarios()
+
+  batch_file = client.files.create(file=("teasers.jsonl", build_batch_input(scenarios)), purpose="batch")
+  batch = client.batches.create(
+    input_file_id=batch_file.id,
+    endpoint="/v1/chat/completions",
+    completion_window="24h"
+  )
+  print(f"Submitted batch {batch.id} with {len(scenarios)} requests, waiting for completion...")
+
+  while batch.status not in FINAL_STATUSES:
+    time.sleep(POLL_INTERVAL)
+    batch = client.batches.retrieve(batch.id)
+    print(f"Batch status: {batch.status}")
+
+  if batch.status != "completed" or not batch.output_file_id:
+    print(f"ERROR: Batch {batch.id} finished with status '{batch.status}'.")
+    sys.exit(1)
+
+  teasers = {}
+  for line in client.files.content(batch.output_file_id).text.splitlines():
+    result = json.loads(line)
+    response = result.get("response") or {}
+    if response.get("status_code") != 200:
+      continue
+    index = int(result["custom_id"].split("-")[1])
+    teasers[scenarios[index]] = response["body"]["choices"][0]["message"]["content"].strip()
+
+  TEASERS_FILE.write_text(json.dumps(teasers, indent=2, ensure_ascii=False), encoding="utf-8")
+  print(f"Wrote {len(teasers)} teasers to {TEASERS_FILE.name}")
+
+
+if __name__ == "__main__":
+  main()
@@ -1,23 +1,36 @@
+import argparse
 import asyncio
-import openai
+import json
 import os
+import re
 import time
-import sys
-from datetime import datetime
+from pathlib import Path
 
-# Initialize OpenAI client
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from display import print_piece, write_bytes
+from llm_client import ERROR_PREFIX, ResponseCache, SlidingWindow, close_client, complete, freeze_prompt, stream_turn
 
-def typewriter_print(text, delay=0.02):
-  """Print text character by character to simulate retro computer output"""
-  for char in text:
-    print(char, end='', flush=True)
-    time.sleep(delay)
-  print()  # Add a newline at the end
+# Checkpoint written after every turn so an interrupted adventure can be resumed
+SAVE_FILE = Path(__file__).with_name(".treasureisland_save.json")
 
-def print_banner():
-  """Print an attractive game banner"""
-  banner = """
+# Models: a stronger model sets the opening scene, a faster one plays the turns
+OPENING_MODEL = "gpt-4o"
+TURN_MODEL = "gpt-4o-mini"
+COMPLETION_PARAMS = {
+  "max_tokens": 1200,  # Increased for richer descriptions
+  "temperature": 0.8,  # Slightly higher for more creative storytelling
+}
+
+# How the game master announces that the adventure is over
+_END_RE = re.compile(r"game over|adventure ended|the end|you have died|treasure found", re.IGNORECASE)
+
+# Commands that only describe the current scene, so their answers can be reused
+CACHEABLE_ACTIONS = {"look", "look around", "inventory", "check inventory", "status", "map"}
+
+# Numbered action options (1-4) the game master presents after each scene
+_OPTION_RE = re.compile(r"^\s*([1-4])[.)]\s*(.+)$", re.MULTILINE)
+
+# Pirate banner shown at startup, encoded once
+BANNER = """
 ╔══════════════════════════════════════════════════════════╗
 ║                    TREASURE ISLAND                       ║
 ║                  Text Adventure Game                     ║
@@ -26,28 +39,57 @@ def print_banner():
 ║             "Yo ho ho and a bottle of rum!"              ║
 ╚══════════════════════════════════════════════════════════╝
   """
-  print(banner)
+_BANNER_BYTES = (BANNER + "\n").encode("utf-8")
+
+def print_banner():
+  """Print an attractive game banner"""
+  write_bytes(_BANNER_BYTES)
+
+def print_response_header():
+  """Print the line shown above each scene"""
+  print("\n" + "═" * 60)
 
 class GameStats:
   """Track game statistics"""
   def __init__(self):
-    self.start_time = datetime.now()
+    self._t0 = time.monotonic()  # Monotonic: unaffected by wall-clock changes
     self.turns = 0
     self.actions_taken = []
+    self.response_cache = ResponseCache(CACHEABLE_ACTIONS)
+    self._speculative = {}
   
   def add_action(self, action):
     self.actions_taken.append(action)
     self.turns += 1
   
+  def start_speculation(self, messages, ai_response):
+    """Start generating the replies to the presented numbered options in the background"""
+    for option, _ in _OPTION_RE.findall(ai_response):
+      if option not in self._speculative:
+        request = messages + [{"role": "user", "content": option}]
+        self._speculative[option] = asyncio.create_task(complete(request, model=TURN_MODEL, **COMPLETION_PARAMS))
+  
+  def take_speculation(self, action):
+    """Get the speculative reply task for the chosen action (or None) and cancel the rest"""
+    task = self._speculative.pop(action, None)
+    self.cancel_speculation()
+    return task
+  
+  def cancel_speculation(self):
+    """Cancel all pending speculative replies"""
+    for task in self._speculative.values():
+      task.cancel()
+    self._speculative.clear()
+  
   def get_play_time(self):
-    return datetime.now() - self.start_time
+    return int(time.monotonic() - self._t0)
   
   def print_stats(self):
-    play_time = self.get_play_time()
+    minutes, seconds = divmod(self.get_play_time(), 60)
     print(f"\n{'='*50}")
     print("GAME STATISTICS:")
     print(f"Turns played: {self.turns}")
-    print(f"Play time: {play_time.seconds // 60}m {play_time.seconds % 60}s")
+    print(f"Play time: {minutes}m {seconds}s")
     print(f"{'='*50}")
 
 game_instructions = """
@@ -80,33 +122,67 @@ Keep track of:
 Start the adventure with the player arriving at a mysterious island, having heard rumors of buried treasure.
 """
 
-async def get_ai_response(messages):
-  """Get response from OpenAI using the Chat Completions API"""
+GAME_INSTRUCTIONS = freeze_prompt(game_instructions, "c94e688be318c4bf40f8bec0da2c38046e36488c0f27fba0bf573603d14df77e")
+
+def get_model(messages):
+  """Use the stronger model only for the opening request (system prompt and start message)"""
+  return OPENING_MODEL if len(messages) == 2 else TURN_MODEL
+
+def save_game(messages, turns):
+  """Write a checkpoint of the conversation, replacing the previous one atomically"""
+  try:
+    temp_file = SAVE_FILE.with_name(SAVE_FILE.name + ".tmp")
+    temp_file.write_text(json.dumps({"turns": turns, "messages": messages}), encoding="utf-8")
+    os.replace(temp_file, SAVE_FILE)
+  except OSError as e:
+    print(f"⚠️ Could not save the game: {str(e)}")
+
+def load_game():
+  """Load the saved checkpoint, or None if there is no usable save"""
+  try:
+    saved_game = json.loads(SAVE_FILE.read_text(encoding="utf-8"))
+  except (OSError, ValueError):
+    return None
+  if not isinstance(saved_game, dict):
+    return None
+  messages = saved_game.get("messages")
+  turns = saved_game.get("turns")
+  if not isinstance(messages, list) or not messages or type(turns) is not int:
+    return None
+  for message in messages:
+    if not (isinstance(message, dict)
+            and isinstance(message.get("role"), str)
+            and isinstance(message.get("content"), str)):
+      return None
+  # Only the first message may be the system prompt (restoring another would
+  # replace GAME_INSTRUCTIONS) and the checkpoint ends with an AI response
+  if messages[0]["role"] != "system" or messages[-1]["role"] != "assistant":
+    return None
+  if any(message["role"] not in ("user", "assistant") for message in messages[1:]):
+    return None
+  return saved_game
+
+def delete_save():
+  """Remove the checkpoint once the adventure is over"""
   try:
-    response = client.chat.completions.create(
-      model="gpt-4",
-      messages=messages,
-      max_tokens=1200,  # Increased for richer descriptions
-      temperature=0.8   # Slightly higher for more creative storytelling
-    )
-    return response.choices[0].message.content
-  except openai.RateLimitError:
-    return "⚠️ Rate limit exceeded. Please wait a moment and try again."
-  except openai.AuthenticationError:
-    return "⚠️ Authentication error. Please check your OpenAI API key."
-  except Exception as e:
-    return f"⚠️ Error getting AI response: {str(e)}"
+    SAVE_FILE.unlink(missing_ok=True)
+  except OSError:
+    pass
 
 def validate_user_input(user_input):
   """Validate and clean user input"""
-  if not user_input or not user_input.strip():
+  if not user_input:
     return None
   
+  # Fast path: typical input is already trimmed and short, so return it as is
+  if len(user_input) <= 500 and not (user_input[0].isspace() or user_input[-1].isspace()):
+    return user_input
+  
   # Remove excessive whitespace and limit length
   cleaned_input = user_input.strip()[:500]  # Limit input length
-  return cleaned_input
+  return cleaned_input or None
 
-async def main():
+async def main(game_stats, speculate=False):
   """Main game loop"""
   print_banner()
   
@@ -114,56 +190,97 @@ async def main():
   print("Your journey begins now...")
   print("\nCommands: Type your action, 'help' for assistance, 'stats' for statistics, or 'quit' to exit")
   
-  # Initialize game statistics
-  game_stats = GameStats()
-  
   # Check for API key
   if not os.getenv("OPENAI_API_KEY"):
     print("⚠️ Warning: No OpenAI API key found. Please set OPENAI_API_KEY environment variable.")
     return
 
   # Initialize conversation with system prompt
-  messages = [
-    {"role": "system", "content": game_instructions},
-    {"role": "user", "content": "Begin the Treasure Island adventure. Set the scene and provide the opening scenario."}
-  ]
+  history = SlidingWindow()
+  history.add("system", GAME_INSTRUCTIONS)
+  resumed_response = None
+  speculative_task = None
+  
+  # Offer to resume a saved adventure
+  saved_game = load_game()
+  if saved_game and input("\n💾 A saved adventure was found. Resume it? (y/n) ").strip().lower().startswith("y"):
+    # Restore the history under the current instructions so the prompt prefix stays cache-friendly
+    for message in saved_game["messages"][1:-1]:
+      history.add(message["role"], message["content"])
+    # Show the last scene again rather than asking the AI for a new one
+    resumed_response = saved_game["messages"][-1]["content"]
+    game_stats.turns = saved_game["turns"]
+  else:
+    history.add("user", "Begin the Treasure Island adventure. Set the scene and provide the opening scenario.")
 
   while True:
     try:
       # Get AI response
       print("\n🏴‍☠️ Loading adventure...")
-      ai_response = await get_ai_response(messages)
+      messages = history.messages()
+      speculative_response = await speculative_task if speculative_task else None
+      speculative_task = None
+      # A resumed scene or a speculated reply is shown instead of a new request
+      reply = None
+      if resumed_response is not None:
+        reply, resumed_response = resumed_response, None
+      elif speculative_response and not speculative_response.startswith(ERROR_PREFIX):
+        reply = speculative_response
       
-      if ai_response.startswith("⚠️"):
-        print(ai_response)
-        break
+      # Print the response as it streams in
+      ai_response = await stream_turn(
+        messages,
+        game_stats.response_cache,
+        print_piece,
+        reply=reply,
+        header=print_response_header,
+        model=get_model(messages),
+        **COMPLETION_PARAMS
+      )
       
-      print("\n" + "═" * 60)
-      typewriter_print(ai_response)
+      if ai_response is None:
+        # Transient errors were already retried, so let the player decide what to do
+        retry = input("Press Enter to try again or type 'quit' to exit: ").strip()
+        if retry.lower() in ['quit', 'exit', 'end']:
+          print("\n🏴‍☠️ Adventure abandoned! Fair winds, matey!")
+          game_stats.print_stats()
+          return
+        continue
       
       # Add AI response to conversation history
-      messages.append({"role": "assistant", "content": ai_response})
-      
-      # Keep conversation history manageable (system + last 12 messages)
-      if len(messages) > 13:
-        messages = [messages[0]] + messages[-12:]
+      history.add("assistant", ai_response)
+      save_game(history.messages(), game_stats.turns)
 
       # Check if game has ended
-      if any(keyword in ai_response.lower() for keyword in 
-             ["game over", "adventure ended", "the end", "you have died", "treasure found"]):
+      if _END_RE.search(ai_response):
+        delete_save()
         game_stats.print_stats()
         print("\n🏴‍☠️ Thank you for playing Treasure Island! ⚓")
         break
+      
+      # Answer the numbered options in the background while the player reads
+      if speculate:
+        game_stats.start_speculation(history.messages(), ai_response)
 
       # Prompt user for next action
       print("\n" + "─" * 40)
       print(f"⚓ Turn {game_stats.turns + 1} ⚓")
       
       while True:
-        user_action = input("\n🗣️ What do you do? ").strip()
+        if speculate:
+          # Wait for input in a thread so the speculative requests keep running
+          try:
+            user_action = (await asyncio.to_thread(input, "\n🗣️ What do you do? ")).strip()
+          except asyncio.CancelledError:
+            # The thread stays blocked on stdin and asyncio.run waits for it on exit
+            print("\n(Press Enter to exit)")
+            raise
+        else:
+          user_action = input("\n🗣️ What do you do? ").strip()
         
         # Handle special commands
         if user_action.lower() in ['quit', 'exit', 'end']:
+          game_stats.cancel_speculation()
           print("\n🏴‍☠️ Adventure abandoned! Fair winds, matey!")
           game_stats.print_stats()
           return
@@ -174,7 +291,7 @@ async def main():
           print("- Use numbered options when provided (e.g., '1', '2', '3')")
           print("- Try creative actions like 'examine the cave', 'talk to the parrot'")
           print("- Type 'stats' to see game statistics")
-          print("- Type 'quit' to exit the game")
+          print("- Type 'quit' to exit the game (your progress is saved)")
           continue
         
         if user_action.lower() == 'stats':
@@ -185,19 +302,37 @@ async def main():
         validated_input = validate_user_input(user_action)
         if validated_input:
           game_stats.add_action(validated_input)
-          messages.append({"role": "user", "content": validated_input})
+          history.add("user", validated_input)
+          speculative_task = game_stats.take_speculation(validated_input)
           break
         else:
           print("⚠️ Please enter a valid action or command.")
     
-    except KeyboardInterrupt:
+    # Ctrl+C while a request is awaited cancels the task instead of raising KeyboardInterrupt
+    except (KeyboardInterrupt, asyncio.CancelledError):
+      game_stats.cancel_speculation()
       print("\n\n🏴‍☠️ Adventure interrupted! Until next time, matey!")
       game_stats.print_stats()
       break
     except Exception as e:
+      # Replies speculated for the interrupted scene no longer apply
+      game_stats.cancel_speculation()
       print(f"\n⚠️ Unexpected error: {str(e)}")
       print("The adventure continues despite the rough seas...")
       continue
 
+async def run(speculate=False):
+  """Run the game, then stop speculative requests and close the shared connection pool"""
+  game_stats = GameStats()
+  try:
+    await main(game_stats, speculate)
+  finally:
+    game_stats.cancel_speculation()
+    await close_client()
+
 if __name__ == "__main__":
-  asyncio.run(main())
+  parser = argparse.ArgumentParser(description="Treasure Island text adventure")
+  parser.add_argument("--speculate", action="store_true",
+                      help="pre-generate replies to the numbered options while you read (uses up to 4x the tokens)")
+  args = parser.parse_args()
+  asyncio.run(run(args.speculate))
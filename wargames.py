@@ -1,31 +1,48 @@
 import asyncio
-import openai
 import os
+import re
 import time
 import sys
-from typing import List, Dict, Optional
 
-# Initialize OpenAI client with error handling
+from display import print_header, print_piece, print_separator
+from llm_client import ResponseCache, SlidingWindow, close_client, freeze_prompt, stream_turn
+from scenarios import WARGAMES_MENU_SIZE, WARGAMES_SCENARIOS, load_scenario_teasers
+
+# Check for the OpenAI API key (the client itself is created on first use)
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
     print("ERROR: OPENAI_API_KEY environment variable not set.")
     print("Please set your OpenAI API key before running the simulation.")
     sys.exit(1)
 
-client = openai.OpenAI(api_key=api_key)
+# How the simulator announces that a scenario has concluded
+_END_RE = re.compile(r"game over|simulation ended|crisis resolved|war ended|scenario complete", re.IGNORECASE)
+
+# Situation reports that restate the current turn, so their answers can be reused
+CACHEABLE_ACTIONS = {"help", "status", "options", "sitrep", "situation report"}
+
+# Predefined scenario options shown in the menu
+PREDEFINED_SCENARIOS = WARGAMES_SCENARIOS
 
 # Configuration
 CONFIG = {
-  "model": "gpt-4",  # Can be changed to "gpt-3.5-turbo" for faster/cheaper responses
+  "model": "gpt-4o-mini",  # Can be changed to "gpt-4o" for richer but slower responses
   "max_tokens": 1000,
   "temperature": 0.7,
-  "typewriter_speed": "medium",  # slow, medium, fast, instant
+  "typewriter_speed": "medium",  # slow, medium, fast, instant (status lines only)
 }
 
 
+# Legacy Windows consoles only interpret ANSI escape codes once VT processing
+# is enabled; an empty os.system call switches it on for this process
+if os.name == 'nt':
+  os.system('')
+
+
 def clear_screen():
   """Clear the terminal screen"""
-  os.system('cls' if os.name == 'nt' else 'clear')
+  sys.stdout.write("\x1b[2J\x1b[H")
+  sys.stdout.flush()
 
 
 def get_typewriter_delay():
@@ -40,51 +57,48 @@ def get_typewriter_delay():
 
 
 def typewriter_print(text, delay=None, prefix=""):
-  """Print text character by character to simulate retro computer output"""
+  """Print text in small timed chunks to simulate retro computer output"""
   if delay is None:
     delay = get_typewriter_delay()
   
-  if prefix:
-    print(prefix, end='', flush=True)
+  if delay <= 0:
+    print(prefix + text)
+    return
   
-  for char in text:
-    print(char, end='', flush=True)
-    if delay > 0:
-      time.sleep(delay)
-  print()  # Add a newline at the end
-
-
-def print_header(title):
-  """Print a formatted header"""
-  border = "=" * 60
-  print(border)
-  print(f"{title:^60}")
-  print(border)
-
-
-def print_separator():
-  """Print a separator line"""
-  print("-" * 60)
+  out = sys.stdout
+  out.write(prefix)
+  # Flush about every 50ms (several characters at a time) instead of once per character
+  step = max(1, round(0.05 / delay))
+  for i in range(0, len(text), step):
+    out.write(text[i:i + step])
+    out.flush()
+    time.sleep(delay * step)
+  out.write("\n")  # Add a newline at the end
+  out.flush()
+
+
+def print_response_header():
+  """Animate the header shown above each AI response"""
+  typewriter_print("STRATEGIC COMMAND SYSTEM", prefix=">>> ")
+  print_separator()
 
 
 class GameState:
   """Manages game state including messages and statistics"""
   
   def __init__(self):
-    self.messages: List[Dict] = []
+    self.history = SlidingWindow()
+    self.response_cache = ResponseCache(CACHEABLE_ACTIONS)
     self.turn_number: int = 0
     self.scenario_name: str = ""
     
   def add_message(self, role: str, content: str):
     """Add a message to the conversation history"""
-    self.messages.append({"role": role, "content": content})
+    self.history.add(role, content)
     
-  def get_messages_for_api(self) -> List[Dict]:
+  def get_messages_for_api(self) -> list[dict]:
     """Get messages formatted for OpenAI API with history management"""
-    # Keep system prompt + last 15 messages to stay within token limits
-    if len(self.messages) > 16:
-      return [self.messages[0]] + self.messages[-15:]
-    return self.messages
+    return self.history.messages()
 
 
 game_instructions = """
@@ -101,52 +115,7 @@ You can support both competitive and cooperative multiplayer storytelling if req
 The tone should be neutral, coolly analytical, and militaristic, with dry wit appropriate to a mainframe AI. You should always prompt the user with the next step until a scenario concludes or is aborted.
 """
 
-async def get_ai_response(messages: List[Dict]) -> str:
-  """Get response from OpenAI using the Chat Completions API with enhanced error handling"""
-  max_retries = 3
-  
-  for attempt in range(max_retries):
-    try:
-      response = client.chat.completions.create(
-        model=CONFIG["model"],
-        messages=messages,
-        max_tokens=CONFIG["max_tokens"],
-        temperature=CONFIG["temperature"]
-      )
-      return response.choices[0].message.content
-    except openai.RateLimitError:
-      if attempt < max_retries - 1:
-        wait_time = 2 ** attempt
-        print(f"Rate limit reached. Waiting {wait_time} seconds...")
-        await asyncio.sleep(wait_time)
-      else:
-        return "ERROR: Rate limit exceeded. Please try again later."
-    except openai.APIConnectionError:
-      return "ERROR: Unable to connect to OpenAI API. Please check your internet connection."
-    except openai.AuthenticationError:
-      return "ERROR: Invalid API key. Please check your OPENAI_API_KEY environment variable."
-    except Exception as e:
-      if attempt < max_retries - 1:
-        await asyncio.sleep(1)
-      else:
-        return f"ERROR: Unable to get AI response: {str(e)}"
-  
-  return "ERROR: Maximum retries exceeded."
-
-
-def get_predefined_scenarios() -> List[str]:
-  """Get list of predefined scenario options"""
-  return [
-    "Cuban Missile Crisis escalation",
-    "Soviet invasion of Western Europe", 
-    "Nuclear submarine incident in Arctic waters",
-    "Middle East proxy conflict between superpowers",
-    "Berlin Wall crisis with military buildup",
-    "Space race competition turns militaristic",
-    "Diplomatic crisis over nuclear weapons testing",
-    "Cyber warfare between intelligence agencies",
-    "Trade war escalation between major powers",
-    "Regional conflict threatens global stability"  ]
+GAME_INSTRUCTIONS = freeze_prompt(game_instructions, "d8276cb2c41f5c1937cb8e2924436207297852c0c175e9d83e0a63eed09d2ce5")
 
 
 async def main():
@@ -160,9 +129,12 @@ async def main():
   
   print("\nPlease provide an initial scenario or crisis to simulate.")
   print("\nExample scenarios:")
-  scenarios = get_predefined_scenarios()[:5]  # Show first 5
+  scenarios = PREDEFINED_SCENARIOS[:WARGAMES_MENU_SIZE]
+  teasers = load_scenario_teasers()
   for scenario in scenarios:
     print(f"  - {scenario}")
+    if scenario in teasers:
+      print(f"      {teasers[scenario]}")
   print("  - Or describe your own scenario...")
   
   user_scenario = input("\nEnter your scenario: ").strip()
@@ -176,32 +148,39 @@ async def main():
   print_separator()
   
   # Initialize conversation with system prompt and user scenario
-  game_state.add_message("system", game_instructions)
+  game_state.add_message("system", GAME_INSTRUCTIONS)
   game_state.add_message("user", user_scenario)
   
   # Main game loop
   while True:
-    game_state.turn_number += 1
-    
-    # Get AI response
-    ai_response = await get_ai_response(game_state.get_messages_for_api())
+    # Stream the AI response, animating the header while the request connects
+    print()  # Add blank line before AI response
+    ai_response = await stream_turn(
+      game_state.get_messages_for_api(),
+      game_state.response_cache,
+      print_piece,
+      header=print_response_header,
+      model=CONFIG["model"],
+      max_tokens=CONFIG["max_tokens"],
+      temperature=CONFIG["temperature"]
+    )
     
-    if ai_response.startswith("ERROR:"):
-      print(f"\n{ai_response}")
-      print("Please try again or type 'quit' to exit.")
+    if ai_response is None:
+      # Transient errors were already retried, so let the player decide what to do
+      retry = input("Press Enter to try again or type 'quit' to exit: ").strip()
+      if retry.lower() in ['quit', 'exit', 'end']:
+        print("SIMULATION ABORTED BY USER")
+        return
       continue
     
-    print()  # Add blank line before AI response
-    typewriter_print("STRATEGIC COMMAND SYSTEM", prefix=">>> ")
-    print_separator()
-    typewriter_print(ai_response)
+    # Only a successful response counts, so a retried one keeps its number
+    game_state.turn_number += 1
     
     # Add AI response to conversation history
     game_state.add_message("assistant", ai_response)
     
     # Check if simulation has ended
-    end_keywords = ["game over", "simulation ended", "crisis resolved", "war ended", "scenario complete"]
-    if any(keyword in ai_response.lower() for keyword in end_keywords):
+    if _END_RE.search(ai_response):
       print_separator()
       typewriter_print("SIMULATION TERMINATED", prefix=">>> ")
       break
@@ -223,5 +202,15 @@ async def main():
     # Add user action to conversation history
     game_state.add_message("user", user_input)
 
+async def run():
+  """Run the game and close the shared connection pool on exit"""
+  try:
+    await main()
+  # Ctrl+C while a request is awaited cancels the task instead of raising KeyboardInterrupt
+  except (KeyboardInterrupt, asyncio.CancelledError):
+    print("\n\nSIMULATION ABORTED BY USER")
+  finally:
+    await close_client()
+
 if __name__ == "__main__":
-  asyncio.run(main())
+  asyncio.run(run())